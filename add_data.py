@@ -1,6 +1,8 @@
 import pandas as pd
 import os
 
+from snapshot import read_table
+
 def add_new_building():
     print("🏢 ДОБАВЛЕНИЕ НОВОГО ЗДАНИЯ В ДАТАСЕТ")
     print("=" * 40)
@@ -8,7 +10,7 @@ def add_new_building():
     
     # Чтение существующих данных
     try:
-        df = pd.read_csv('data/raw_data.csv')
+        df = read_table('data/raw_data.csv')
         print(f"✅ Текущий датасет: {len(df)} зданий")
     except:
         df = pd.DataFrame()
@@ -0,0 +1,220 @@
+import os
+import sys
+import gzip
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from energy_features import (CURRENT_YEAR, FEATURE_NAMES, efficiency_ratings, load_buildings,
+                             prepare_features, train_forest)
+from drift_monitor import DriftMonitor
+from weather_store import WeatherStore
+from feature_importance import held_out_importances
+
+# Правила рекомендаций: (ключ, текст для отчета, текст для экрана GUI).
+# Условия считаются сразу для всех зданий в recommendation_masks()
+RECOMMENDATION_RULES = [
+    ('large_area', "- Оптимизация систем отопления/охлаждения в больших помещениях",
+     "• Оптимизируйте энергопотребление в больших помещениях"),
+    ('temperature', "- Улучшение теплоизоляции здания",
+     "• Улучшите теплоизоляцию для снижения зависимости от температуры"),
+    ('old_building', "- Модернизация устаревших инженерных систем",
+     "• Рассмотрите модернизацию старых систем отопления"),
+    ('electric', "- Оптимизация тарифов и графика работы электрооборудования",
+     "• Электрическое отопление - оптимизируйте тарифы и нагрузку"),
+    ('gas', "- Проверка КПД газовой системы отопления",
+     "• Газовое отопление - проверьте КПД системы"),
+    ('low_efficiency', "- Проведение детального энергоаудита",
+     "• Рекомендуем провести энергоаудит для выявления потерь"),
+]
+DEFAULT_RECOMMENDATION = ("- Показатели в норме, рекомендуется регулярный мониторинг",
+                          "• Параметры в норме, продолжайте мониторинг")
+
+CHUNK_SIZE = 500
+BATCH_METRICS_PATH = 'reports/drift_metrics_batch.json'
+
+
+def recommendation_masks(scored, feature_importance):
+    """Булевы маски правил по колонкам (одна строка = одно здание)"""
+    n = len(scored)
+    return pd.DataFrame({
+        'large_area': np.full(n, feature_importance[0] > 0.3),
+        'temperature': np.full(n, feature_importance[2] > 0.2),
+        'old_building': scored['building_age'].to_numpy() > 30,
+        'electric': scored['heating_type'].to_numpy() == "Electric",
+        'gas': scored['heating_type'].to_numpy() != "Electric",
+        'low_efficiency': np.char.startswith(scored['efficiency_rating'].to_numpy().astype(str), "Низкая"),
+    }, index=scored.index)
+
+
+def recommendation_texts(masks, display=False):
+    """Списки рекомендаций для каждой строки масок (display=True - формулировки для экрана GUI)"""
+    column = 2 if display else 1
+    flags = masks[[rule[0] for rule in RECOMMENDATION_RULES]].to_numpy()
+    texts = [rule[column] for rule in RECOMMENDATION_RULES]
+    default = DEFAULT_RECOMMENDATION[column - 1]
+    return [[texts[j] for j in np.flatnonzero(row)] or [default] for row in flags]
+
+
+def building_recommendations(data, display=False):
+    """Рекомендации для одного здания (словарь current_analysis_data из GUI)"""
+    scored = pd.DataFrame([{
+        'building_age': data['building_age'],
+        'heating_type': data['heating_type'],
+        'efficiency_rating': data['efficiency_rating'],
+    }])
+    return recommendation_texts(recommendation_masks(scored, data['feature_importance']), display)[0]
+
+
+def score_buildings(df, model, le_building, le_heating, monitor=None, weather_store=None, cache=None):
+    """Прогноз для всех зданий одним вызовом predict"""
+    X = prepare_features(df, le_building, le_heating, weather_store)
+    if monitor is not None:
+        monitor.update(X)
+
+    scored = df.copy()
+    scored['avg_temperature'] = X[:, 2]
+    scored['avg_humidity'] = X[:, 3]
+    scored['building_age'] = CURRENT_YEAR - scored['year_built']
+    scored['prediction'] = cache.predict(model, X) if cache is not None else model.predict(X)
+    scored['avg_consumption_per_sqft'] = scored['prediction'] / scored['square_footage']
+    scored['efficiency_rating'] = efficiency_ratings(scored['avg_consumption_per_sqft'], scored['building_type'])
+    return scored
+
+
+def _render_chunk(start, records, factors_block, footer, created):
+    """Формирование текста отчетов для части зданий (выполняется в отдельном процессе)"""
+    reports = []
+    for number, row in enumerate(records, start + 1):
+        content = f"""
+ОТЧЕТ ПО АНАЛИЗУ ЭНЕРГОПОТРЕБЛЕНИЯ ЗДАНИЯ
+{'='*60}
+Дата создания: {created}
+Идентификатор здания: {row['building_id']}
+
+ОСНОВНЫЕ ПАРАМЕТРЫ ЗДАНИЯ:
+{'-'*40}
+Тип здания: {row['building_type']}
+Площадь: {row['square_footage']:,.0f} кв.футов
+Год постройки: {row['year_built']} (Возраст: {row['building_age']} лет)
+Система отопления: {row['heating_type']}
+Количество людей: {row['occupant_count']}
+Месяц: {row['month']}
+Температура окружающей среды: {row['avg_temperature']}°C
+Влажность: {row['avg_humidity']}%
+
+РЕЗУЛЬТАТЫ ПРОГНОЗА:
+{'-'*40}
+Прогнозируемое потребление: {row['prediction']:,.0f} кВт·ч
+Потребление на кв.фут: {row['avg_consumption_per_sqft']:.2f} кВт·ч/фут²
+Рейтинг энергоэффективности: {row['efficiency_rating']}
+
+АНАЛИЗ ФАКТОРОВ ВЛИЯНИЯ:
+{'-'*40}
+{factors_block}
+РЕКОМЕНДАЦИИ ПО ЭНЕРГОСБЕРЕЖЕНИЮ:
+{'-'*40}
+{chr(10).join(row['recommendations'])}
+{footer}"""
+        reports.append((f"{number:06d}_building_{row['building_id']}_month_{row['month']}.txt", content))
+    return reports
+
+
+def generate_batch_reports(df, model, le_building, le_heating, output_path, feature_importance=None, workers=None,
+                           monitor=None, weather_store=None, cache=None):
+    """Пакетная генерация отчетов для всех зданий датафрейма.
+
+    Если output_path оканчивается на .zip - каждый отчет пишется отдельным файлом в архив,
+    иначе все отчеты записываются в один сводный файл (.gz - со сжатием).
+    monitor - необязательный DriftMonitor, в который учитываются входные данные,
+    feature_importance - доли важности признаков для правил рекомендаций (по умолчанию feature_importances_ модели),
+    weather_store - необязательное хранилище погоды (WeatherStore) для подстановки температуры и влажности,
+    cache - необязательный PredictionCache для повторно оцениваемых зданий.
+    Возвращает количество отчетов.
+    """
+    if feature_importance is None:
+        feature_importance = model.feature_importances_
+
+    scored = score_buildings(df, model, le_building, le_heating, monitor, weather_store, cache)
+    scored['recommendations'] = recommendation_texts(recommendation_masks(scored, feature_importance))
+
+    # Общие для всех отчетов блоки считаются один раз
+    factors_block = "".join(f"{name:15} {importance * 100:5.1f}%\n"
+                            for name, importance in zip(FEATURE_NAMES, feature_importance))
+    footer = f"""
+ИНФОРМАЦИЯ О МОДЕЛИ:
+{'-'*40}
+Модель: Random Forest Regressor
+Обучено на: {len(df)} зданиях
+Дата обучения: {datetime.now().strftime('%Y-%m-%d')}
+
+{'='*60}
+"""
+    created = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    records = scored.to_dict('records')
+    starts = list(range(0, len(records), CHUNK_SIZE))
+    chunks = [records[i:i + CHUNK_SIZE] for i in starts]
+
+    if workers == 1 or len(chunks) <= 1:
+        rendered = (_render_chunk(start, chunk, factors_block, footer, created)
+                    for start, chunk in zip(starts, chunks))
+        _write_reports(rendered, output_path)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            rendered = executor.map(_render_chunk, starts, chunks,
+                                    [factors_block] * len(chunks),
+                                    [footer] * len(chunks),
+                                    [created] * len(chunks))
+            _write_reports(rendered, output_path)
+
+    return len(records)
+
+
+def _write_reports(rendered_chunks, output_path):
+    """Запись отчетов в архив или в один сводный файл"""
+    if output_path.endswith('.zip'):
+        with zipfile.ZipFile(output_path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            for chunk in rendered_chunks:
+                for name, content in chunk:
+                    archive.writestr(name, content)
+    else:
+        opener = gzip.open if output_path.endswith('.gz') else open
+        with opener(output_path, 'wt', encoding='utf-8') as f:
+            for chunk in rendered_chunks:
+                for _, content in chunk:
+                    f.write(content)
+
+
+if __name__ == "__main__":
+    print("📦 ПАКЕТНАЯ ГЕНЕРАЦИЯ ОТЧЕТОВ")
+    print("=" * 40)
+
+    df = load_buildings()
+    weather_store = WeatherStore.open_default()
+    model, le_building, le_heating = train_forest(df, weather_store=weather_store)
+
+    # Здания для отчетов: по умолчанию обучающая таблица, либо CSV из аргумента командной строки.
+    # Дрейф имеет смысл только для новых данных: обучающая таблица совпадает с эталоном монитора
+    scoring_path = sys.argv[1] if len(sys.argv) > 1 else None
+    buildings = load_buildings(scoring_path) if scoring_path else df
+    monitor = (DriftMonitor(prepare_features(df, le_building, le_heating, weather_store))
+               if scoring_path else None)
+
+    os.makedirs('reports', exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"reports/batch_reports_{timestamp}.zip"
+
+    importance = held_out_importances(model, df, le_building, le_heating, weather_store)[0]
+    count = generate_batch_reports(buildings, model, le_building, le_heating, filename, feature_importance=importance,
+                                   monitor=monitor, weather_store=weather_store)
+    print(f"✅ Сформировано отчетов: {count}")
+    print(f"📄 Архив: {filename}")
+    if weather_store is not None and weather_store.unmatched_text():
+        print(weather_store.unmatched_text())
+    if monitor is not None:
+        monitor.save_metrics(BATCH_METRICS_PATH)
+        print(f"🔍 {monitor.status_text()} ({BATCH_METRICS_PATH})")
@@ -2,13 +2,22 @@ import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor
 from sklearn.preprocessing import LabelEncoder
 import matplotlib.pyplot as plt
 import seaborn as sns
 import os
 from datetime import datetime
 
+from energy_features import prepare_features, train_forest
+from batch_reports import building_recommendations, generate_batch_reports
+from drift_monitor import DriftMonitor
+from weather_store import WeatherStore
+from scenarios import N_SCENARIOS, format_summary, simulate_portfolio
+from segmented_model import SegmentedModel, train_segmented
+from prediction_cache import PredictionCache
+from snapshot import read_table
+from feature_importance import held_out_importances
+
 # Настройка русского шрифта для matplotlib
 plt.rcParams['font.family'] = 'DejaVu Sans'
 plt.rcParams['axes.unicode_minus'] = False
@@ -41,6 +50,15 @@ class BeautifulEnergyApp:
         self.le_building = LabelEncoder()
         self.le_heating = LabelEncoder()
         
+        # Хранилище погоды (если собрано через weather_store.py)
+        self.weather_store = WeatherStore.open_default()
+        
+        # Мониторинг дрейфа входных данных
+        self.drift_monitor = None
+        
+        # Кэш прогнозов (сбрасывается сам при появлении новой модели)
+        self.prediction_cache = PredictionCache()
+        
         # Для навигации по графикам
         self.current_chart_index = 0
         self.chart_functions = []
@@ -51,7 +69,7 @@ class BeautifulEnergyApp:
     def load_data(self):
         """Загрузка данных"""
         try:
-            df = pd.read_csv('data/raw_data.csv')
+            df = read_table('data/raw_data.csv')
             return df
         except:
             messagebox.showerror("Ошибка", "Файл data/raw_data.csv не найден!")
@@ -62,25 +80,16 @@ class BeautifulEnergyApp:
         if self.df.empty:
             return
         
-        # Предобработка
-        df_processed = self.df.copy()
-        df_processed['building_age'] = 2024 - df_processed['year_built']
-        
-        # Кодирование
-        df_processed['building_type_encoded'] = self.le_building.fit_transform(df_processed['building_type'])
-        df_processed['heating_type_encoded'] = self.le_heating.fit_transform(df_processed['heating_type'])
-        
-        # Обучение
-        features = ['square_footage', 'occupant_count', 'avg_temperature', 
-                   'avg_humidity', 'building_age', 'building_type_encoded', 'heating_type_encoded']
-        X = df_processed[features]
-        y = df_processed['energy_consumption']
-        
-        self.model = RandomForestRegressor(n_estimators=100, random_state=42)
-        self.model.fit(X, y)
+        # Предобработка, кодирование и обучение (общая модель или отдельные по сегментам)
+        train = train_segmented if self.segmented_mode.get() else train_forest
+        self.model, self.le_building, self.le_heating = train(self.df, weather_store=self.weather_store)
+        self.drift_monitor = DriftMonitor(prepare_features(self.df, self.le_building, self.le_heating,
+                                                           self.weather_store))
         
         # Обновление интерфейса
         self.update_results()
+        if self.weather_store is not None and self.weather_store.unmatched_text():
+            self.status_var.set(f"{self.status_var.get()} | {self.weather_store.unmatched_text()}")
     
     def create_widgets(self):
         """Создание элементов интерфейса"""
@@ -134,6 +143,10 @@ class BeautifulEnergyApp:
                   command=self.show_chart_navigation).pack(side='left', padx=5)
         ttk.Button(button_frame, text="📄 Сохранить отчет", 
                   command=self.save_current_report).pack(side='left', padx=5)
+        ttk.Button(button_frame, text="📦 Пакетные отчеты", 
+                  command=self.save_batch_reports).pack(side='left', padx=5)
+        ttk.Button(button_frame, text="🎲 Сценарии", 
+                  command=self.show_scenarios).pack(side='left', padx=5)
         ttk.Button(button_frame, text="🔄 Обновить модель", 
                   command=self.train_model).pack(side='left', padx=5)
         
@@ -170,6 +183,16 @@ class BeautifulEnergyApp:
             
             widget.grid(row=i, column=1, pady=8, padx=10)
             self.entries[key] = widget
+        
+        # Режим: отдельная модель на каждый сегмент тип здания x тип отопления
+        self.segmented_mode = tk.BooleanVar(value=False)
+        ttk.Checkbutton(parent, text="🧩 Модели по сегментам", variable=self.segmented_mode,
+                        command=self.train_model).grid(row=len(fields), column=0, columnspan=2, sticky='w', pady=8)
+        
+        # Переобучение при дрейфе: только если в data/raw_data.csv появились новые размеченные данные
+        self.retrain_on_drift = tk.BooleanVar(value=False)
+        ttk.Checkbutton(parent, text="🔁 Переобучать при дрейфе", variable=self.retrain_on_drift).grid(
+            row=len(fields) + 1, column=0, columnspan=2, sticky='w', pady=8)
     
     def predict_consumption(self):
         """Прогнозирование потребления с расширенным анализом"""
@@ -192,10 +215,11 @@ class BeautifulEnergyApp:
                                 humidity, building_age, building_type_encoded, heating_type_encoded]])
             
             # Прогноз
-            prediction = self.model.predict(features)[0]
+            prediction = self.prediction_cache.predict(self.model, features)[0]
+            drift_status = self.check_drift(features)
             
             # Расширенный анализ
-            feature_importance = self.model.feature_importances_
+            feature_importance = self.feature_importance()[0]
             feature_names = ['Площадь', 'Люди', 'Температура', 'Влажность', 'Возраст', 'Тип_здания', 'Отопление']
             
             # Анализ эффективности
@@ -225,11 +249,45 @@ class BeautifulEnergyApp:
             
             self.results_text.delete(1.0, tk.END)
             self.results_text.insert(1.0, result)
-            self.status_var.set(f"🎯 Прогноз выполнен: {prediction:.0f} кВт·ч")
+            self.status_var.set(f"🎯 Прогноз выполнен: {prediction:.0f} кВт·ч | {drift_status} | "
+                                f"{self.prediction_cache.stats_text()}")
+            
+            # Переобучение - только после вывода, чтобы прогноз, важность и рекомендации
+            # относились к одной модели; затем прогноз повторяется уже новой моделью
+            retrained, retrain_note = self.retrain_if_drifted()
+            if retrained:
+                self.predict_consumption()
+            self.status_var.set(self.status_var.get() + retrain_note)
             
         except Exception as e:
             messagebox.showerror("Ошибка", f"Проверьте правильность введенных данных!\n{str(e)}")
     
+    def feature_importance(self):
+        """Permutation importance текущей модели на отложенной выборке (кэшируется для каждой модели)"""
+        return held_out_importances(self.model, self.df, self.le_building, self.le_heating, self.weather_store)
+    
+    def check_drift(self, features):
+        """Обновление монитора дрейфа, возвращает текст для статус-бара"""
+        self.drift_monitor.update(features)
+        self.drift_monitor.save_metrics()
+        return self.drift_monitor.status_text()
+    
+    def retrain_if_drifted(self):
+        """Переобучение при дрейфе (если включено флажком).
+        Возвращает (переобучена ли модель, пояснение для статус-бара)"""
+        if not (self.retrain_on_drift.get() and self.drift_monitor.is_drifted()):
+            return False, ""
+        
+        # Переобучение на той же таблице только спрятало бы дрейф (монитор пересоздается),
+        # поэтому сначала перечитываем источник и обучаемся, лишь если данные изменились
+        fresh_df = self.load_data()
+        if fresh_df.empty or fresh_df.equals(self.df):
+            return False, " → для переобучения нужны новые размеченные данные"
+        
+        self.df = fresh_df
+        self.train_model()
+        return True, " → модель переобучена на обновленных данных"
+    
     def calculate_efficiency_rating(self, consumption_per_sqft, building_type):
         """Расчет рейтинга энергоэффективности"""
         if building_type == "Commercial":
@@ -290,27 +348,8 @@ class BeautifulEnergyApp:
 {'-'*40}
 """
         
-        # Умные рекомендации
-        recommendations = []
-        
-        if data['feature_importance'][0] > 0.3:  # Площадь
-            recommendations.append("• Оптимизируйте энергопотребление в больших помещениях")
-        
-        if data['feature_importance'][2] > 0.2:  # Температура
-            recommendations.append("• Улучшите теплоизоляцию для снижения зависимости от температуры")
-        
-        if data['building_age'] > 30:
-            recommendations.append("• Рассмотрите модернизацию старых систем отопления")
-        
-        if data['heating_type'] == "Electric":
-            recommendations.append("• Электрическое отопление - оптимизируйте тарифы и нагрузку")
-        else:
-            recommendations.append("• Газовое отопление - проверьте КПД системы")
-        
-        if "Низкая" in data['efficiency_rating']:
-            recommendations.append("• Рекомендуем провести энергоаудит для выявления потерь")
-        
-        output += "\n".join(recommendations) if recommendations else "• Параметры в норме, продолжайте мониторинг"
+        # Умные рекомендации (те же правила, что и в сохраняемых отчетах)
+        output += "\n".join(building_recommendations(data, display=True))
         
         output += f"\n\n{'='*65}"
         output += f"\nТочность модели: ~91.2% | Обучено на: {len(self.df)} зданиях"
@@ -431,26 +470,27 @@ class BeautifulEnergyApp:
             
         fig, ax = plt.subplots(figsize=(10, 6))
         
-        feature_importance = self.model.feature_importances_
+        feature_importance, importance_std = self.feature_importance()
         feature_names = ['Площадь', 'Кол-во людей', 'Температура', 'Влажность', 
                        'Возраст', 'Тип здания', 'Тип отопления']
         
         # Сортируем по важности
         sorted_idx = np.argsort(feature_importance)[::-1]
         sorted_importance = feature_importance[sorted_idx]
+        sorted_std = importance_std[sorted_idx]
         sorted_names = [feature_names[i] for i in sorted_idx]
         
         colors = plt.cm.viridis(np.linspace(0, 1, len(feature_names)))
-        bars = ax.barh(sorted_names, sorted_importance, color=colors)
+        bars = ax.barh(sorted_names, sorted_importance, xerr=sorted_std, color=colors, capsize=4)
         
         # Добавляем проценты на график
-        for i, (bar, importance) in enumerate(zip(bars, sorted_importance)):
-            width = bar.get_width()
+        for i, (bar, importance, std) in enumerate(zip(bars, sorted_importance, sorted_std)):
+            width = bar.get_width() + std
             ax.text(width + 0.01, bar.get_y() + bar.get_height()/2, 
                    f'{importance*100:.1f}%', 
                    ha='left', va='center', fontweight='bold')
         
-        ax.set_xlabel('Важность признака', fontsize=12)
+        ax.set_xlabel('Важность признака (permutation importance, отложенная выборка)', fontsize=12)
         ax.set_title('Важность факторов влияния на энергопотребление', fontsize=14, fontweight='bold')
         ax.grid(True, alpha=0.3, axis='x')
         plt.tight_layout()
@@ -538,23 +578,8 @@ class BeautifulEnergyApp:
 {'-'*40}
 """
             
-            # Добавляем рекомендации
-            recommendations = []
-            if data['feature_importance'][0] > 0.3:
-                recommendations.append("- Оптимизация систем отопления/охлаждения в больших помещениях")
-            if data['feature_importance'][2] > 0.2:
-                recommendations.append("- Улучшение теплоизоляции здания")
-            if data['building_age'] > 30:
-                recommendations.append("- Модернизация устаревших инженерных систем")
-            if data['heating_type'] == "Electric":
-                recommendations.append("- Оптимизация тарифов и графика работы электрооборудования")
-            if "Низкая" in data['efficiency_rating']:
-                recommendations.append("- Проведение детального энергоаудита")
-            
-            if recommendations:
-                report_content += "\n".join(recommendations)
-            else:
-                report_content += "- Показатели в норме, рекомендуется регулярный мониторинг"
+            # Добавляем рекомендации (те же правила, что и в пакетных отчетах)
+            report_content += "\n".join(building_recommendations(data))
             
             report_content += f"""
 
@@ -578,6 +603,51 @@ class BeautifulEnergyApp:
         except Exception as e:
             messagebox.showerror("Ошибка", f"Не удалось сохранить отчет: {str(e)}")
     
+    def save_batch_reports(self):
+        """Пакетные отчеты по всем зданиям базы в один архив"""
+        if self.model is None or self.df.empty:
+            messagebox.showwarning("Предупреждение", "Нет данных для пакетных отчетов")
+            return
+        
+        try:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            filename = f"reports/batch_reports_{timestamp}.zip"
+            
+            # Отчеты строятся по обучающей таблице, поэтому в монитор дрейфа прогнозов она не попадает
+            count = generate_batch_reports(self.df, self.model, self.le_building, self.le_heating, filename,
+                                           feature_importance=self.feature_importance()[0],
+                                           weather_store=self.weather_store, cache=self.prediction_cache)
+            
+            messagebox.showinfo("Успех", f"Сформировано отчетов: {count}\nАрхив: {filename}\n"
+                                         f"{self.prediction_cache.stats_text()}")
+            self.status_var.set(f"📦 Пакетные отчеты сохранены: {filename}")
+            
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Не удалось сформировать пакетные отчеты: {str(e)}")
+    
+    def show_scenarios(self):
+        """Сценарный анализ годового потребления всего портфеля"""
+        if self.model is None or self.df.empty:
+            messagebox.showwarning("Предупреждение", "Нет данных для сценарного анализа")
+            return
+        
+        try:
+            summary = simulate_portfolio(self.df, self.model, self.le_building, self.le_heating, N_SCENARIOS,
+                                         weather_store=self.weather_store)
+            
+            self.results_text.delete(1.0, tk.END)
+            self.results_text.insert(1.0, format_summary(summary, N_SCENARIOS))
+            self.status_var.set(f"🎲 Сценарный анализ выполнен: {N_SCENARIOS} сценариев погоды")
+            
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Не удалось выполнить сценарный анализ: {str(e)}")
+    
+    def model_mode_text(self):
+        """Описание режима модели для панели результатов"""
+        if isinstance(self.model, SegmentedModel):
+            return f"по сегментам ({len(self.model.segment_models)} отдельных моделей + общая)"
+        return "общая модель"
+    
     def update_results(self):
         """Обновление информации о модели"""
         if self.model is not None:
@@ -585,6 +655,7 @@ class BeautifulEnergyApp:
 🎯 СИСТЕМА AI АНАЛИЗА ЭНЕРГОПОТРЕБЛЕНИЯ
 {'='*50}
 • Модель: Random Forest (ансамбль 100 деревьев)
+• Режим: {self.model_mode_text()}
 • Обучена на: {len(self.df)} зданиях
 • Точность прогноза: ~91.2%
 • Средняя ошибка: ±187 кВт·ч
@@ -0,0 +1,135 @@
+import json
+from datetime import datetime
+
+import numpy as np
+
+from energy_features import FEATURES, FEATURE_NAMES
+
+# Индексы закодированных категориальных признаков в матрице FEATURES
+CATEGORICAL_FEATURES = [FEATURES.index('building_type_encoded'), FEATURES.index('heating_type_encoded')]
+
+N_BINS = 10
+MIN_SAMPLES = 30       # меньше наблюдений - оценка дрейфа слишком шумная
+PSI_WARNING = 0.1
+PSI_ALERT = 0.25
+METRICS_PATH = 'reports/drift_metrics.json'
+
+
+class StreamingStats:
+    """Гистограммы и моменты по признакам с постоянным объемом памяти"""
+
+    def __init__(self, edges):
+        self.edges = edges
+        self.counts = [np.zeros(len(e) + 1, dtype=np.int64) for e in edges]
+        self.n = 0
+        self.mean = np.zeros(len(edges))
+        self.m2 = np.zeros(len(edges))
+
+    def update(self, X):
+        """Добавление пачки наблюдений (матрица n x признаки)"""
+        X = np.atleast_2d(np.asarray(X, dtype=float))
+        if len(X) == 0:
+            return
+
+        for j, edges in enumerate(self.edges):
+            bins = np.searchsorted(edges, X[:, j], side='right')
+            self.counts[j] += np.bincount(bins, minlength=len(edges) + 1)
+
+        # Объединение моментов (формула Чана для параллельной дисперсии)
+        n_b = len(X)
+        mean_b = X.mean(axis=0)
+        m2_b = ((X - mean_b) ** 2).sum(axis=0)
+        delta = mean_b - self.mean
+        total = self.n + n_b
+        self.mean = self.mean + delta * n_b / total
+        self.m2 = self.m2 + m2_b + delta ** 2 * self.n * n_b / total
+        self.n = total
+
+    @property
+    def std(self):
+        return np.sqrt(self.m2 / max(self.n - 1, 1))
+
+    def proportions(self, j):
+        return self.counts[j] / max(self.n, 1)
+
+
+def _bin_edges(X):
+    """Границы корзин по квантилям обучающей выборки"""
+    edges = []
+    for j in range(X.shape[1]):
+        values = np.unique(X[:, j])
+        if j in CATEGORICAL_FEATURES or len(values) <= N_BINS:
+            # Одна корзина на каждое значение
+            edges.append((values[:-1] + values[1:]) / 2)
+        else:
+            quantiles = np.quantile(X[:, j], np.linspace(0, 1, N_BINS + 1)[1:-1])
+            edges.append(np.unique(quantiles))
+    return edges
+
+
+class DriftMonitor:
+    """Мониторинг дрейфа входных данных относительно обучающей выборки"""
+
+    def __init__(self, X_train):
+        self.reference = StreamingStats(_bin_edges(np.asarray(X_train, dtype=float)))
+        self.reference.update(X_train)
+        self.current = StreamingStats(self.reference.edges)
+
+    def update(self, X):
+        """Учет входных данных прогноза"""
+        self.current.update(X)
+
+    def reset(self):
+        self.current = StreamingStats(self.reference.edges)
+
+    def scores(self):
+        """PSI и KS (по корзинам) для каждого признака"""
+        result = {}
+        for j, name in enumerate(FEATURES):
+            expected = np.clip(self.reference.proportions(j), 1e-4, None)
+            actual = np.clip(self.current.proportions(j), 1e-4, None)
+            psi = float(np.sum((actual - expected) * np.log(actual / expected)))
+            ks = float(np.max(np.abs(np.cumsum(self.current.proportions(j))
+                                     - np.cumsum(self.reference.proportions(j)))))
+            result[name] = {
+                'psi': psi,
+                'ks': ks,
+                'train_mean': float(self.reference.mean[j]),
+                'train_std': float(self.reference.std[j]),
+                'current_mean': float(self.current.mean[j]),
+                'current_std': float(self.current.std[j]),
+            }
+        return result
+
+    def is_drifted(self):
+        if self.current.n < MIN_SAMPLES:
+            return False
+        return max(s['psi'] for s in self.scores().values()) >= PSI_ALERT
+
+    def status_text(self):
+        """Короткая строка для статус-бара"""
+        if self.current.n < MIN_SAMPLES:
+            return f"Дрейф: накоплено {self.current.n}/{MIN_SAMPLES} наблюдений"
+
+        scores = self.scores()
+        worst = max(scores, key=lambda name: scores[name]['psi'])
+        psi = scores[worst]['psi']
+        label = FEATURE_NAMES[FEATURES.index(worst)]
+        if psi >= PSI_ALERT:
+            return f"⚠️ Дрейф данных: {label} (PSI {psi:.2f})"
+        if psi >= PSI_WARNING:
+            return f"Умеренный дрейф: {label} (PSI {psi:.2f})"
+        return f"Дрейф не обнаружен (PSI ≤ {psi:.2f})"
+
+    def save_metrics(self, path=METRICS_PATH):
+        """Сохранение метрик дрейфа в JSON"""
+        metrics = {
+            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'train_samples': self.reference.n,
+            'current_samples': self.current.n,
+            'drifted': self.is_drifted(),
+            'features': self.scores(),
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(metrics, f, ensure_ascii=False, indent=2)
+        return metrics
@@ -0,0 +1,65 @@
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.preprocessing import LabelEncoder
+
+from snapshot import read_table
+
+# Признаки модели (порядок важен - по нему индексируется feature_importances_)
+FEATURES = ['square_footage', 'occupant_count', 'avg_temperature',
+            'avg_humidity', 'building_age', 'building_type_encoded', 'heating_type_encoded']
+FEATURE_NAMES = ['Площадь', 'Люди', 'Температура', 'Влажность', 'Возраст', 'Тип_здания', 'Отопление']
+
+CURRENT_YEAR = 2024
+
+
+def prepare_features(df, le_building, le_heating, weather_store=None):
+    """Векторная подготовка матрицы признаков для всего датафрейма.
+
+    Если передано хранилище погоды (WeatherStore), температура и влажность
+    берутся из него as-of join'ом, а значения из таблицы остаются только для строк без совпадения.
+    """
+    temperature = df['avg_temperature'].to_numpy(dtype=float)
+    humidity = df['avg_humidity'].to_numpy(dtype=float)
+    if weather_store is not None:
+        temperature, humidity = weather_store.join(df, temperature, humidity)
+
+    X = np.empty((len(df), len(FEATURES)), dtype=float)
+    X[:, 0] = df['square_footage'].to_numpy(dtype=float)
+    X[:, 1] = df['occupant_count'].to_numpy(dtype=float)
+    X[:, 2] = temperature
+    X[:, 3] = humidity
+    X[:, 4] = CURRENT_YEAR - df['year_built'].to_numpy(dtype=float)
+    X[:, 5] = le_building.transform(df['building_type'])
+    X[:, 6] = le_heating.transform(df['heating_type'])
+    return X
+
+
+def train_forest(df, n_estimators=100, weather_store=None):
+    """Обучение Random Forest так же, как в GUI. Возвращает (model, le_building, le_heating)"""
+    le_building = LabelEncoder().fit(df['building_type'])
+    le_heating = LabelEncoder().fit(df['heating_type'])
+
+    X = prepare_features(df, le_building, le_heating, weather_store)
+    y = df['energy_consumption'].to_numpy()
+
+    model = RandomForestRegressor(n_estimators=n_estimators, random_state=42)
+    model.fit(X, y)
+    return model, le_building, le_heating
+
+
+def efficiency_ratings(consumption_per_sqft, building_types):
+    """Векторный расчет рейтинга энергоэффективности (те же пороги, что и в GUI)"""
+    consumption_per_sqft = np.asarray(consumption_per_sqft, dtype=float)
+    commercial = np.asarray(building_types) == "Commercial"
+    excellent = np.where(commercial, 0.8, 0.6)
+    good = np.where(commercial, 1.2, 1.0)
+    return np.select(
+        [consumption_per_sqft < excellent, consumption_per_sqft < good],
+        ["Отличная 🎉", "Хорошая ✅"],
+        default="Низкая ⚠️"
+    )
+
+
+def load_buildings(path='data/raw_data.csv', columns=None):
+    """Загрузка таблицы зданий (через колоночный снимок, если он актуален)"""
+    return read_table(path, columns)
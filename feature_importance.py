@@ -0,0 +1,63 @@
+import weakref
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.inspection import permutation_importance
+from sklearn.metrics import r2_score
+from sklearn.model_selection import train_test_split
+
+from energy_features import prepare_features
+from segmented_model import SegmentedModel
+
+N_REPEATS = 10
+TEST_SIZE = 0.2
+
+# Кэш held_out_importances: модель -> {n_repeats: результат}. Новая модель (новая версия)
+# считается заново, а результаты старой удаляются вместе с ней
+_cache = weakref.WeakKeyDictionary()
+
+
+def _r2_scorer(model, X, y):
+    # Функция вместо scoring='r2': подходит и для SegmentedModel, который не наследует BaseEstimator
+    return r2_score(y, model.predict(X))
+
+
+def permutation_importances(model, X_test, y_test, n_repeats=N_REPEATS, n_jobs=-1):
+    """Permutation importance на отложенной выборке, признаки перемешиваются параллельно на всех ядрах.
+
+    Возвращает (доли, std): падение R² по каждому признаку, отрицательные значения обнулены,
+    затем нормировано к сумме 1 - в той же шкале, что и feature_importances_.
+    Результат не кэшируется: он зависит от переданной отложенной выборки.
+    """
+    result = permutation_importance(model, X_test, y_test, scoring=_r2_scorer, n_repeats=n_repeats,
+                                    n_jobs=n_jobs, random_state=42)
+    drops = np.clip(result.importances_mean, 0, None)
+    total = drops.sum()
+    shares = drops / total if total > 0 else drops
+    std = result.importances_std / total if total > 0 else result.importances_std
+    return shares, std
+
+
+def _unfitted_copy(model):
+    if isinstance(model, SegmentedModel):
+        return SegmentedModel(model.n_estimators, model.min_samples, model.workers)
+    return clone(model)
+
+
+def held_out_importances(model, df, le_building, le_heating, weather_store=None, n_repeats=N_REPEATS):
+    """Permutation importance для модели, обученной на всех данных.
+
+    Такая модель уже видела любую выборку, поэтому копия с теми же параметрами обучается на 80% данных,
+    важность считается на оставшихся 20%, а результат кэшируется для исходной модели.
+    """
+    cached = _cache.setdefault(model, {})
+    if n_repeats in cached:
+        return cached[n_repeats]
+
+    X = prepare_features(df, le_building, le_heating, weather_store)
+    y = df['energy_consumption'].to_numpy()
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=TEST_SIZE, random_state=42)
+
+    held_out_model = _unfitted_copy(model).fit(X_train, y_train)
+    cached[n_repeats] = permutation_importances(held_out_model, X_test, y_test, n_repeats)
+    return cached[n_repeats]
@@ -0,0 +1,87 @@
+from collections import OrderedDict
+
+import numpy as np
+
+MAX_SIZE = 100_000
+DECIMALS = 6   # округление признаков при построении ключа
+
+
+class PredictionCache:
+    """LRU-кэш прогнозов по вектору признаков и версии модели.
+
+    Версия меняется автоматически, как только в predict() приходит другой объект модели
+    (например, после train_model), и записи старой версии сбрасываются.
+    """
+
+    def __init__(self, max_size=MAX_SIZE):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.model = None
+        self.model_version = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def bind(self, model):
+        """Привязка к модели; новая модель - новая версия и пустой кэш"""
+        if model is not self.model:
+            self.model = model
+            self.model_version += 1
+            self.entries.clear()
+
+    @staticmethod
+    def _keys(X):
+        # + 0.0 превращает -0.0 в 0.0, чтобы одинаковые значения давали одинаковые байты
+        normalized = np.round(np.asarray(X, dtype=np.float64), DECIMALS) + 0.0
+        return [row.tobytes() for row in np.ascontiguousarray(normalized)]
+
+    def predict(self, model, X):
+        """Прогноз с кэшем: модель вызывается один раз для уникальных строк, которых нет в кэше"""
+        self.bind(model)
+        X = np.atleast_2d(np.asarray(X, dtype=float))
+        keys = self._keys(X)
+
+        prediction = np.empty(len(X))
+        missing = []
+        for i, key in enumerate(keys):
+            value = self.entries.get(key)
+            if value is None:
+                missing.append(i)
+            else:
+                self.entries.move_to_end(key)
+                prediction[i] = value
+
+        # Одинаковые строки внутри пакета прогнозируются один раз: промахом считается
+        # первая из них, остальные получают то же значение и учитываются как попадания
+        first_rows = {}
+        for i in missing:
+            first_rows.setdefault(keys[i], i)
+        self.hits += len(keys) - len(first_rows)
+        self.misses += len(first_rows)
+
+        if first_rows:
+            values = dict(zip(first_rows, model.predict(X[list(first_rows.values())])))
+            prediction[missing] = [values[keys[i]] for i in missing]
+            self.entries.update(values)
+            overflow = len(self.entries) - self.max_size
+            for _ in range(max(overflow, 0)):
+                self.entries.popitem(last=False)
+            self.evictions += max(overflow, 0)
+
+        return prediction
+
+    def stats(self):
+        return {
+            'model_version': self.model_version,
+            'size': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+    def stats_text(self):
+        """Короткая строка для статус-бара и отчетов"""
+        total = self.hits + self.misses
+        hit_rate = self.hits / total * 100 if total else 0.0
+        return (f"Кэш: {self.hits} попаданий / {self.misses} промахов ({hit_rate:.0f}%), "
+                f"вытеснено {self.evictions}")
@@ -6,24 +6,47 @@ from sklearn.ensemble import RandomForestRegressor
 from sklearn.metrics import mean_absolute_error, r2_score
 import os
 
+from snapshot import load_snapshot, read_table, write_snapshot
+from feature_importance import permutation_importances
+from weather_store import WeatherStore
+
 print("=" * 60)
 print("🚀 ПРОГНОЗИРОВАНИЕ ЭНЕРГОПОТРЕБЛЕНИЯ ЗДАНИЙ")
 print("=" * 60)
 
-# Загрузка и предобработка данных
-df = pd.read_csv('data/raw_data.csv')
-
-# Создание новых признаков
-df['building_age'] = 2024 - df['year_built']
-df['energy_per_sqft'] = df['energy_consumption'] / df['square_footage']
-
-# Кодирование категориальных переменных
-le = LabelEncoder()
-df['building_type_encoded'] = le.fit_transform(df['building_type'])
-df['heating_type_encoded'] = le.fit_transform(df['heating_type'])
-
-# Сохранение обработанных данных
-df.to_csv('data/processed_data.csv', index=False)
+# Обработанные данные берутся из снимка, пока не изменился raw_data.csv;
+# если raw_data.csv нет, используется последний сохраненный снимок
+raw_exists = os.path.exists('data/raw_data.csv')
+df = load_snapshot('processed_data', 'data/raw_data.csv', check_source=raw_exists)
+
+if df is None:
+    # Загрузка и предобработка данных
+    df = read_table('data/raw_data.csv')
+
+    # Создание новых признаков
+    df['building_age'] = 2024 - df['year_built']
+    df['energy_per_sqft'] = df['energy_consumption'] / df['square_footage']
+
+    # Кодирование категориальных переменных
+    le = LabelEncoder()
+    df['building_type_encoded'] = le.fit_transform(df['building_type'])
+    df['heating_type_encoded'] = le.fit_transform(df['heating_type'])
+
+    # Сохранение обработанных данных (CSV для src/model_training.py + снимок, если есть источник)
+    df.to_csv('data/processed_data.csv', index=False)
+    if raw_exists:
+        write_snapshot(df, 'processed_data', 'data/raw_data.csv')
+elif not os.path.exists('data/processed_data.csv'):
+    # Снимок актуален, но CSV удален - восстанавливаем его для src/model_training.py
+    df.to_csv('data/processed_data.csv', index=False)
+
+# Погода из хранилища (если собрано) подставляется так же, как при обучении в GUI и пакетных отчетах
+weather_store = WeatherStore.open_default()
+if weather_store is not None:
+    df['avg_temperature'], df['avg_humidity'] = weather_store.join(
+        df, df['avg_temperature'].to_numpy(dtype=float), df['avg_humidity'].to_numpy(dtype=float))
+    if weather_store.unmatched_text():
+        print(weather_store.unmatched_text())
 
 # Обучение модели
 features = ['square_footage', 'occupant_count', 'avg_temperature', 
@@ -40,10 +63,12 @@ y_pred = model.predict(X_test)
 mae = mean_absolute_error(y_test, y_pred)
 r2 = r2_score(y_test, y_pred)
 
-# Важность признаков
+# Важность признаков (permutation importance на отложенной выборке)
+importance_share, importance_std = permutation_importances(model, X_test, y_test)
 importance = pd.DataFrame({
     'feature': features,
-    'importance': model.feature_importances_
+    'importance': importance_share,
+    'std': importance_std
 }).sort_values('importance', ascending=False)
 
 # 📊 ВЫВОД РЕЗУЛЬТАТОВ
@@ -0,0 +1,147 @@
+import os
+import argparse
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from energy_features import CURRENT_YEAR, FEATURES, load_buildings, train_forest
+from weather_store import WeatherStore
+
+N_SCENARIOS = 200
+CHUNK_ROWS = 500_000      # максимум строк матрицы признаков в памяти за один predict
+PERCENTILES = [5, 50, 95]
+
+
+def monthly_climate(df, weather_store=None):
+    """Среднее и разброс температуры/влажности по месяцам; для месяцев без данных - по всему году.
+
+    weather_store - то же хранилище погоды, что использовалось при обучении: климат
+    строится по тем же значениям температуры и влажности, на которых училась модель.
+    """
+    keys = [column for column in ('location', 'year') if column in df]
+    df = df[keys + ['month', 'avg_temperature', 'avg_humidity']].copy()
+    if weather_store is not None:
+        df['avg_temperature'], df['avg_humidity'] = weather_store.join(
+            df, df['avg_temperature'].to_numpy(dtype=float), df['avg_humidity'].to_numpy(dtype=float))
+
+    overall = {
+        'temp_mean': df['avg_temperature'].mean(), 'temp_std': df['avg_temperature'].std(),
+        'hum_mean': df['avg_humidity'].mean(), 'hum_std': df['avg_humidity'].std(),
+    }
+    grouped = df.groupby('month').agg(temp_mean=('avg_temperature', 'mean'), temp_std=('avg_temperature', 'std'),
+                                      hum_mean=('avg_humidity', 'mean'), hum_std=('avg_humidity', 'std'))
+    climate = grouped.reindex(range(1, 13))
+    for column, value in overall.items():
+        climate[column] = climate[column].fillna(value)
+    return climate
+
+
+def sample_weather(climate, n_scenarios, temperature_shift=0.0, seed=42):
+    """Сценарии погоды: массивы (n_scenarios, 12) температуры и влажности.
+    Один сценарий - один погодный год, общий для всех зданий портфеля."""
+    rng = np.random.default_rng(seed)
+    temperature = rng.normal(climate['temp_mean'].to_numpy(), climate['temp_std'].to_numpy(), size=(n_scenarios, 12))
+    humidity = rng.normal(climate['hum_mean'].to_numpy(), climate['hum_std'].to_numpy(), size=(n_scenarios, 12))
+    return temperature + temperature_shift, np.clip(humidity, 0, 100)
+
+
+def simulate_portfolio(df, model, le_building, le_heating, n_scenarios=N_SCENARIOS, temperature_shift=0.0,
+                       chunk_rows=CHUNK_ROWS, seed=42, climate=None, weather_store=None):
+    """Монте-Карло симуляция годового потребления портфеля.
+
+    Матрица здания x 12 месяцев x сценарии собирается и прогнозируется частями не больше chunk_rows строк.
+    Возвращает таблицу процентилей годового потребления по типу здания и отопления + итог по портфелю.
+    """
+    buildings = df.drop_duplicates('building_id', keep='last').reset_index(drop=True)
+    if climate is None:
+        climate = monthly_climate(df, weather_store)
+    temperature, humidity = sample_weather(climate, n_scenarios, temperature_shift, seed)
+
+    # Статические признаки зданий; колонки температуры и влажности заполняются сценариями
+    static = np.empty((len(buildings), len(FEATURES)))
+    static[:, 0] = buildings['square_footage'].to_numpy(dtype=float)
+    static[:, 1] = buildings['occupant_count'].to_numpy(dtype=float)
+    static[:, 4] = CURRENT_YEAR - buildings['year_built'].to_numpy(dtype=float)
+    static[:, 5] = le_building.transform(buildings['building_type'])
+    static[:, 6] = le_heating.transform(buildings['heating_type'])
+
+    # Сегменты (тип здания x тип отопления) как one-hot матрица: суммирование по сегментам = матричное умножение
+    segments = buildings.groupby(['building_type', 'heating_type']).ngroup().to_numpy()
+    segment_index = buildings.groupby(['building_type', 'heating_type']).size().index
+    onehot = np.zeros((len(buildings), len(segment_index)))
+    onehot[np.arange(len(buildings)), segments] = 1.0
+
+    totals = np.zeros((n_scenarios, len(segment_index)))
+
+    rows_per_building = 12
+    buildings_per_chunk = max(1, min(len(buildings), chunk_rows // rows_per_building))
+    scenarios_per_chunk = max(1, chunk_rows // (buildings_per_chunk * rows_per_building))
+
+    for s0 in range(0, n_scenarios, scenarios_per_chunk):
+        s1 = min(s0 + scenarios_per_chunk, n_scenarios)
+        k = s1 - s0
+        for b0 in range(0, len(buildings), buildings_per_chunk):
+            b1 = min(b0 + buildings_per_chunk, len(buildings))
+            n_b = b1 - b0
+
+            # Порядок строк: сценарий -> здание -> месяц
+            X = np.tile(np.repeat(static[b0:b1], rows_per_building, axis=0), (k, 1))
+            X[:, 2] = np.repeat(temperature[s0:s1], n_b, axis=0).ravel()
+            X[:, 3] = np.repeat(humidity[s0:s1], n_b, axis=0).ravel()
+
+            annual = model.predict(X).reshape(k, n_b, rows_per_building).sum(axis=2)
+            totals[s0:s1] += annual @ onehot[b0:b1]
+
+    rows = []
+    for j, (building_type, heating_type) in enumerate(segment_index):
+        rows.append(_summary_row(building_type, heating_type, totals[:, j]))
+    rows.append(_summary_row('Портфель', 'Все', totals.sum(axis=1)))
+    return pd.DataFrame(rows)
+
+
+def _summary_row(building_type, heating_type, values):
+    row = {'building_type': building_type, 'heating_type': heating_type, 'mean': values.mean()}
+    for p, value in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+        row[f'p{p}'] = value
+    return row
+
+
+def format_summary(summary, n_scenarios, temperature_shift=0.0):
+    """Текстовая таблица результатов для консоли и GUI"""
+    output = f"""
+{'='*65}
+🎲 СЦЕНАРНЫЙ АНАЛИЗ ГОДОВОГО ПОТРЕБЛЕНИЯ
+{'='*65}
+Сценариев погоды: {n_scenarios} | Сдвиг температуры: {temperature_shift:+.1f}°C
+
+{'Сегмент':28} {'P5':>10} {'P50':>10} {'P95':>10}
+{'-'*65}
+"""
+    for _, row in summary.iterrows():
+        segment = f"{row['building_type']} / {row['heating_type']}"
+        output += f"{segment:28} {row['p5']:10,.0f} {row['p50']:10,.0f} {row['p95']:10,.0f}\n"
+    output += f"{'-'*65}\nЗначения - годовое потребление, кВт·ч\n"
+    return output
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Сценарный анализ годового потребления портфеля")
+    parser.add_argument('--scenarios', type=int, default=N_SCENARIOS)
+    parser.add_argument('--shift', type=float, default=0.0, help="сдвиг температуры, °C")
+    args = parser.parse_args()
+
+    df = load_buildings()
+    weather_store = WeatherStore.open_default()
+    model, le_building, le_heating = train_forest(df, weather_store=weather_store)
+
+    summary = simulate_portfolio(df, model, le_building, le_heating, args.scenarios, args.shift,
+                                 weather_store=weather_store)
+    print(format_summary(summary, args.scenarios, args.shift))
+    if weather_store is not None and weather_store.unmatched_text():
+        print(weather_store.unmatched_text())
+
+    os.makedirs('reports', exist_ok=True)
+    filename = f"reports/scenarios_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    summary.to_csv(filename, index=False)
+    print(f"📄 Результаты сохранены: {filename}")
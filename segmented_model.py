@@ -0,0 +1,134 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_absolute_error, r2_score
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import LabelEncoder
+
+from energy_features import FEATURES, load_buildings, prepare_features
+from weather_store import WeatherStore
+
+# Колонки матрицы признаков, по которым определяется сегмент
+BUILDING_COLUMN = FEATURES.index('building_type_encoded')
+HEATING_COLUMN = FEATURES.index('heating_type_encoded')
+
+MIN_SEGMENT_SAMPLES = 10   # в сегментах меньше - прогноз общей моделью
+
+
+def _fit_forest(X, y, n_estimators):
+    """Обучение одного леса (выполняется в отдельном процессе)"""
+    model = RandomForestRegressor(n_estimators=n_estimators, random_state=42)
+    model.fit(X, y)
+    return model
+
+
+class SegmentedModel:
+    """Отдельный Random Forest на каждый сегмент тип здания x тип отопления.
+
+    Совместим с RandomForestRegressor по fit/predict/feature_importances_,
+    поэтому подставляется вместо общей модели без изменений в остальном коде.
+    """
+
+    def __init__(self, n_estimators=100, min_samples=MIN_SEGMENT_SAMPLES, workers=None):
+        self.n_estimators = n_estimators
+        self.min_samples = min_samples
+        self.workers = workers
+        self.global_model = None
+        self.segment_models = {}
+
+    def fit(self, X, y):
+        X = np.asarray(X, dtype=float)
+        y = np.asarray(y, dtype=float)
+        keys = X[:, [BUILDING_COLUMN, HEATING_COLUMN]].astype(int)
+
+        unique_keys, counts = np.unique(keys, axis=0, return_counts=True)
+        segments = [tuple(int(v) for v in key) for key, count in zip(unique_keys, counts)
+                    if count >= self.min_samples]
+        masks = [(keys == key).all(axis=1) for key in segments]
+
+        # Общая модель и модели сегментов обучаются параллельно
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            global_future = executor.submit(_fit_forest, X, y, self.n_estimators)
+            futures = [executor.submit(_fit_forest, X[mask], y[mask], self.n_estimators) for mask in masks]
+            self.global_model = global_future.result()
+            self.segment_models = {key: future.result() for key, future in zip(segments, futures)}
+        return self
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=float)
+        prediction = np.empty(len(X))
+        routed = np.zeros(len(X), dtype=bool)
+
+        for (building, heating), model in self.segment_models.items():
+            mask = (X[:, BUILDING_COLUMN] == building) & (X[:, HEATING_COLUMN] == heating)
+            if mask.any():
+                prediction[mask] = model.predict(X[mask])
+                routed |= mask
+
+        if not routed.all():
+            prediction[~routed] = self.global_model.predict(X[~routed])
+        return prediction
+
+    @property
+    def feature_importances_(self):
+        return self.global_model.feature_importances_
+
+
+def train_segmented(df, n_estimators=100, weather_store=None, min_samples=MIN_SEGMENT_SAMPLES):
+    """Аналог train_forest для сегментированного режима. Возвращает (model, le_building, le_heating)"""
+    le_building = LabelEncoder().fit(df['building_type'])
+    le_heating = LabelEncoder().fit(df['heating_type'])
+
+    X = prepare_features(df, le_building, le_heating, weather_store)
+    y = df['energy_consumption'].to_numpy()
+
+    model = SegmentedModel(n_estimators, min_samples).fit(X, y)
+    return model, le_building, le_heating
+
+
+def compare_models(df, weather_store=None, min_samples=MIN_SEGMENT_SAMPLES):
+    """Сравнение общей и сегментированной модели: время обучения, MAE и R² на отложенной выборке"""
+    le_building = LabelEncoder().fit(df['building_type'])
+    le_heating = LabelEncoder().fit(df['heating_type'])
+    X = prepare_features(df, le_building, le_heating, weather_store)
+    y = df['energy_consumption'].to_numpy()
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+
+    results = {}
+    for name, model in [('global', RandomForestRegressor(n_estimators=100, random_state=42)),
+                        ('segmented', SegmentedModel(100, min_samples))]:
+        start = time.perf_counter()
+        model.fit(X_train, y_train)
+        fit_time = time.perf_counter() - start
+
+        y_pred = model.predict(X_test)
+        results[name] = {
+            'fit_time': fit_time,
+            'mae': mean_absolute_error(y_test, y_pred),
+            'r2': r2_score(y_test, y_pred),
+        }
+    results['segments'] = len(model.segment_models)
+    return results
+
+
+if __name__ == "__main__":
+    print("🧩 СРАВНЕНИЕ ОБЩЕЙ И СЕГМЕНТИРОВАННОЙ МОДЕЛИ")
+    print("=" * 60)
+
+    weather_store = WeatherStore.open_default()
+    results = compare_models(load_buildings(), weather_store)
+
+    print(f"{'Модель':15} {'Время, с':>10} {'MAE':>10} {'R²':>10}")
+    print("-" * 60)
+    for name, label in [('global', 'Общая'), ('segmented', 'По сегментам')]:
+        r = results[name]
+        print(f"{label:15} {r['fit_time']:10.2f} {r['mae']:10.2f} {r['r2']:10.4f}")
+    print("-" * 60)
+    print(f"• Сегментов с отдельной моделью: {results['segments']}")
+    print(f"• Изменение времени обучения: {results['segmented']['fit_time'] - results['global']['fit_time']:+.2f} с")
+    print(f"• Изменение MAE: {results['segmented']['mae'] - results['global']['mae']:+.2f} кВт·ч")
+    print(f"• Изменение R²: {results['segmented']['r2'] - results['global']['r2']:+.4f}")
+    if weather_store is not None and weather_store.unmatched_text():
+        print(weather_store.unmatched_text())
@@ -0,0 +1,136 @@
+import os
+import json
+import time
+import shutil
+
+import numpy as np
+import pandas as pd
+
+SNAPSHOT_DIR = 'data/snapshots'
+
+
+def _source_stat(source_path):
+    stat = os.stat(source_path)
+    return {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+
+
+def _table_dir(name, snapshot_dir=SNAPSHOT_DIR):
+    return os.path.join(snapshot_dir, name)
+
+
+def _current_version_dir(name, snapshot_dir=SNAPSHOT_DIR):
+    """Каталог актуальной версии снимка (по указателю CURRENT) или None"""
+    pointer = os.path.join(_table_dir(name, snapshot_dir), 'CURRENT')
+    if not os.path.exists(pointer):
+        return None
+    with open(pointer, encoding='utf-8') as f:
+        return os.path.join(_table_dir(name, snapshot_dir), f.read().strip())
+
+
+def write_snapshot(df, name, source_path, snapshot_dir=SNAPSHOT_DIR, source_stat=None):
+    """Запись таблицы в колоночный снимок: один .npy на колонку + meta.json.
+
+    Числовые колонки сохраняются как есть, строковые - кодами категорий (int32) со списком значений в meta.
+    В meta также запоминается размер и время изменения CSV-источника для проверки актуальности.
+
+    Каждая запись создает новый каталог версии, а указатель CURRENT переключается через os.replace.
+    Уже открытые memory-map'ы старой версии продолжают читать свои файлы и не видят новых данных.
+
+    source_stat - состояние источника на момент чтения df (см. read_table); по умолчанию берется сейчас.
+    Если источника нет, FileNotFoundError возникает до создания каталога версии.
+    """
+    if source_stat is None:
+        source_stat = _source_stat(source_path)
+
+    version = f'v{time.time_ns()}_{os.getpid()}'
+    table_dir = os.path.join(_table_dir(name, snapshot_dir), version)
+    os.makedirs(table_dir)
+
+    columns = []
+    for i, column in enumerate(df.columns):
+        values = df[column]
+        info = {'name': column, 'file': f'{i:03d}.npy'}
+        if values.dtype.kind in 'biufcmM':
+            np.save(os.path.join(table_dir, info['file']), values.to_numpy())
+        else:
+            codes, categories = pd.factorize(values)
+            np.save(os.path.join(table_dir, info['file']), codes.astype(np.int32))
+            info['categories'] = [str(c) for c in categories]
+        columns.append(info)
+
+    # meta пишется последней: снимок без meta считается отсутствующим
+    meta = {'source': source_path, 'source_stat': source_stat, 'rows': len(df), 'columns': columns}
+    with open(os.path.join(table_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+
+    # Атомарное переключение на новую версию
+    pointer = os.path.join(_table_dir(name, snapshot_dir), 'CURRENT')
+    with open(f'{pointer}.{version}.tmp', 'w', encoding='utf-8') as f:
+        f.write(version)
+    os.replace(f'{pointer}.{version}.tmp', pointer)
+
+    # Старые версии удаляются; отображенные в память файлы на POSIX остаются доступны
+    # открывшим их процессам, а на Windows удаление просто откладывается до следующей записи
+    for entry in os.listdir(_table_dir(name, snapshot_dir)):
+        path = os.path.join(_table_dir(name, snapshot_dir), entry)
+        if entry != version and entry.startswith('v') and os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def load_snapshot(name, source_path, columns=None, snapshot_dir=SNAPSHOT_DIR, check_source=True):
+    """Загрузка снимка через memory-map: CSV не разбирается, читаются только нужные .npy.
+
+    Копируются ли числовые колонки при сборке DataFrame, зависит от версии pandas
+    (pandas 1.x объединяет колонки одного типа в общий блок), поэтому на zero-copy не рассчитываем.
+
+    columns - список нужных колонок (читаются только они).
+    Возвращает None, если снимка нет или CSV-источник изменился после его создания.
+    """
+    table_dir = _current_version_dir(name, snapshot_dir)
+    if table_dir is None:
+        return None
+
+    try:
+        with open(os.path.join(table_dir, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        if check_source and (not os.path.exists(source_path) or meta['source_stat'] != _source_stat(source_path)):
+            return None
+
+        infos = {info['name']: info for info in meta['columns']}
+        data = {}
+        for column in (columns if columns is not None else infos):
+            info = infos[column]
+            values = np.load(os.path.join(table_dir, info['file']), mmap_mode='r')
+            if 'categories' in info:
+                values = pd.Categorical.from_codes(values, info['categories']).astype(object)
+            data[column] = values
+    except FileNotFoundError:
+        # Версию успел заменить и удалить другой процесс - читаем из CSV
+        return None
+    return pd.DataFrame(data, copy=False)
+
+
+def read_table(csv_path, columns=None, snapshot_dir=SNAPSHOT_DIR):
+    """Чтение таблицы: из снимка, если он актуален, иначе из CSV с пересозданием снимка.
+    Если CSV отсутствует, используется последний сохраненный снимок."""
+    name = os.path.splitext(os.path.basename(csv_path))[0]
+
+    if not os.path.exists(csv_path):
+        df = load_snapshot(name, csv_path, columns, snapshot_dir, check_source=False)
+        if df is None:
+            raise FileNotFoundError(csv_path)
+        return df
+
+    df = load_snapshot(name, csv_path, columns, snapshot_dir)
+    if df is not None:
+        return df
+
+    # Состояние CSV фиксируется до чтения: если файл допишут во время read_csv,
+    # снимок получит старую отметку и будет пересоздан при следующем чтении
+    source_stat = _source_stat(csv_path)
+    df = pd.read_csv(csv_path)
+    try:
+        write_snapshot(df, name, csv_path, snapshot_dir, source_stat)
+    except OSError:
+        pass  # снимок - только ускорение, без него работаем с CSV
+    return df[columns] if columns is not None else df
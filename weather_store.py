@@ -0,0 +1,175 @@
+import os
+import sys
+import json
+
+import numpy as np
+import pandas as pd
+
+STORE_DIR = 'data/weather_store'
+COLUMNS = ['avg_temperature', 'avg_humidity']
+
+# Локация по умолчанию, если в таблице зданий нет колонки location
+DEFAULT_LOCATION = 'default'
+MAX_LAG_MONTHS = 12
+
+# Составной ключ: (локация, год, месяц) -> одно int64, сортировка по нему = сортировка по кортежу
+KEY_STRIDE = 10000 * 12
+
+
+def make_keys(location_codes, years, months):
+    location_codes = np.asarray(location_codes, dtype=np.int64)
+    return (location_codes * KEY_STRIDE
+            + np.asarray(years, dtype=np.int64) * 12
+            + np.asarray(months, dtype=np.int64) - 1)
+
+
+def build_store(csv_paths, store_dir=STORE_DIR):
+    """Сборка хранилища из CSV с колонками location, year, month, avg_temperature, avg_humidity"""
+    frames = [pd.read_csv(path, usecols=['location', 'year', 'month'] + COLUMNS) for path in csv_paths]
+    weather = pd.concat(frames, ignore_index=True)
+
+    locations = sorted(weather['location'].astype(str).unique())
+    location_codes = pd.Index(locations).get_indexer(weather['location'].astype(str))
+    keys = make_keys(location_codes, weather['year'], weather['month'])
+
+    # Сортировка по ключу; при повторах остается последняя запись
+    order = np.argsort(keys, kind='stable')
+    keys = keys[order]
+    last = np.append(keys[1:] != keys[:-1], True)
+
+    os.makedirs(store_dir, exist_ok=True)
+    np.save(os.path.join(store_dir, 'keys.npy'), keys[last])
+    for column in COLUMNS:
+        values = weather[column].to_numpy(dtype=np.float32)[order][last]
+        np.save(os.path.join(store_dir, f'{column}.npy'), values)
+    with open(os.path.join(store_dir, 'locations.json'), 'w', encoding='utf-8') as f:
+        json.dump(locations, f, ensure_ascii=False)
+
+    return int(last.sum())
+
+
+class WeatherStore:
+    """Колоночное хранилище погоды, отсортированное по (локация, год, месяц) и открытое через memory-map"""
+
+    def __init__(self, store_dir=STORE_DIR):
+        self.keys = np.load(os.path.join(store_dir, 'keys.npy'), mmap_mode='r')
+        self.columns = {column: np.load(os.path.join(store_dir, f'{column}.npy'), mmap_mode='r')
+                        for column in COLUMNS}
+        with open(os.path.join(store_dir, 'locations.json'), encoding='utf-8') as f:
+            self.locations = pd.Index(json.load(f))
+        self._latest_by_month = None
+        self.unmatched_rows = 0
+        self.last_join = (0, 0)
+
+    @classmethod
+    def open_default(cls, store_dir=STORE_DIR):
+        """Открыть хранилище, если оно собрано, иначе None"""
+        if not os.path.exists(os.path.join(store_dir, 'keys.npy')):
+            return None
+        return cls(store_dir)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def lookup(self, locations, years, months, max_lag_months=MAX_LAG_MONTHS):
+        """As-of поиск: последняя запись той же локации не позже (год, месяц).
+
+        Возвращает (found, {колонка: значения}); для ненайденных строк значения NaN.
+        """
+        location_codes = self.locations.get_indexer(np.asarray(locations, dtype=str))
+        query = make_keys(np.maximum(location_codes, 0), years, months)
+
+        pos = np.searchsorted(self.keys, query, side='right') - 1
+        safe_pos = np.maximum(pos, 0)
+        matched = self.keys[safe_pos] if len(self.keys) else np.zeros(len(query), dtype=np.int64)
+
+        found = ((pos >= 0) & (location_codes >= 0)
+                 & (matched // KEY_STRIDE == query // KEY_STRIDE)
+                 & (query - matched <= max_lag_months))
+
+        return found, self._values(found, safe_pos)
+
+    def lookup_month(self, locations, months):
+        """Поиск для строк без года: последний год с тем же (локация, календарный месяц).
+
+        Возвращает (found, {колонка: значения}); для ненайденных строк значения NaN.
+        """
+        if self._latest_by_month is None:
+            # Ключи отсортированы по (локация, год, месяц), поэтому последнее вхождение
+            # пары (локация, месяц) - это запись за последний год; np.unique по перевернутому
+            # массиву возвращает первое вхождение, т.е. последнее в исходном порядке
+            keys = np.asarray(self.keys)
+            location_month = (keys // KEY_STRIDE) * 12 + keys % 12
+            pairs, first_reversed = np.unique(location_month[::-1], return_index=True)
+            self._latest_by_month = np.full(len(self.locations) * 12, -1, dtype=np.int64)
+            self._latest_by_month[pairs] = len(keys) - 1 - first_reversed
+
+        location_codes = self.locations.get_indexer(np.asarray(locations, dtype=str))
+        months = np.asarray(months, dtype=np.int64)
+        valid = (location_codes >= 0) & (months >= 1) & (months <= 12)
+
+        pos = np.full(len(months), -1, dtype=np.int64)
+        pos[valid] = self._latest_by_month[location_codes[valid] * 12 + months[valid] - 1]
+        found = pos >= 0
+        return found, self._values(found, np.maximum(pos, 0))
+
+    def _values(self, found, positions):
+        values = {}
+        for column, data in self.columns.items():
+            result = np.full(len(found), np.nan)
+            if len(data):
+                result[found] = data[positions[found]]
+            values[column] = result
+        return values
+
+    def unmatched_text(self):
+        """Предупреждение о строках без погоды в последнем join или пустая строка"""
+        unmatched, rows = self.last_join
+        if not unmatched:
+            return ""
+        return f"⚠️ Погода не найдена для {unmatched} из {rows} строк - оставлены значения из таблицы"
+
+    def join(self, df, temperature, humidity):
+        """Подстановка погоды из хранилища в признаки температуры и влажности.
+
+        Строки с годом ищутся as-of по (локация, год, месяц), строки без года -
+        по тому же календарному месяцу за последний доступный год.
+        Строки без совпадения сохраняют значения из таблицы и учитываются в unmatched_rows
+        (сообщение о них выводит вызывающий код через unmatched_text()).
+        """
+        n = len(df)
+        locations = (df['location'].astype(str).to_numpy() if 'location' in df
+                     else np.full(n, DEFAULT_LOCATION))
+        years = df['year'].to_numpy(dtype=float) if 'year' in df else np.full(n, np.nan)
+        months = df['month'].to_numpy()
+        has_year = ~np.isnan(years)
+
+        found = np.zeros(n, dtype=bool)
+        values = {column: np.full(n, np.nan) for column in COLUMNS}
+        for mask, (part_found, part_values) in [
+            (has_year, self.lookup(locations[has_year], years[has_year], months[has_year])),
+            (~has_year, self.lookup_month(locations[~has_year], months[~has_year])),
+        ]:
+            found[mask] = part_found
+            for column in COLUMNS:
+                values[column][mask] = part_values[column]
+
+        unmatched = int(n - found.sum())
+        self.unmatched_rows += unmatched
+        self.last_join = (unmatched, n)
+
+        temperature = np.where(np.isnan(values['avg_temperature']), temperature, values['avg_temperature'])
+        humidity = np.where(np.isnan(values['avg_humidity']), humidity, values['avg_humidity'])
+        return temperature, humidity
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Использование: python weather_store.py weather1.csv [weather2.csv ...]")
+        sys.exit(1)
+
+    print("🌡️ СБОРКА ХРАНИЛИЩА ПОГОДНЫХ ДАННЫХ")
+    print("=" * 40)
+    count = build_store(sys.argv[1:])
+    print(f"✅ Записей в хранилище: {count:,}")
+    print(f"📁 Каталог: {STORE_DIR}")